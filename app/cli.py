@@ -0,0 +1,332 @@
+"""Command line tool running the encryption and signing strategies directly
+on NDJSON files (one JSON object per line), without going through the API.
+
+Usage example:
+    python -m app.cli encrypt records.ndjson -o encrypted.ndjson
+    python -m app.cli sign records/ -o signatures/ --algorithm blake2b
+
+Inputs are memory-mapped and split into chunks of lines, which are processed
+in parallel by a pool of processes. The output keeps the order of the input.
+"""
+
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import json
+import mmap
+import os
+from pathlib import Path
+import sys
+import time
+
+from pydantic_core import to_json
+
+from app.core.encryption_strategies import Base64EncryptionStrategy
+from app.core.signing_strategies import (
+    DEFAULT_SIGNING_ALGORITHM,
+    SIGNING_STRATEGIES,
+    get_signing_strategy,
+    parse_signature,
+)
+
+COMMANDS = ("encrypt", "decrypt", "sign", "verify")
+INPUT_FILE_SUFFIXES = (".ndjson", ".jsonl")
+DEFAULT_CHUNK_BYTES = 4 * 1024 * 1024
+PROGRESS_INTERVAL = 0.5  # Seconds between two progress reports
+
+encryption_strategy = Base64EncryptionStrategy()
+
+
+class RecordError(ValueError):
+    """Raised when a line of an input file cannot be processed."""
+
+
+def process_record(command: str, record: dict, algorithm: str) -> dict:
+    """Apply the command to a single record, like the endpoint of the same
+    name would do with it as request body."""
+    if command == "encrypt":
+        return encryption_strategy.encrypt_json_payload(record)
+    if command == "decrypt":
+        return encryption_strategy.decrypt_json_payload(record)
+    if command == "sign":
+        signing_strategy = get_signing_strategy(algorithm)
+        return signing_strategy.sign_json_payload(record).model_dump()
+
+    data, signature = record.get("data"), record.get("signature")
+    if not isinstance(data, dict) or not isinstance(signature, str):
+        raise RecordError('expected an object with "data" and "signature"')
+    signing_strategy = get_signing_strategy(parse_signature(signature)[0])
+    is_valid = signing_strategy is not None and signing_strategy.is_signature_valid(
+        data, signature
+    )
+    return {"valid": is_valid}
+
+
+def process_chunk(
+    command: str, path: str, start: int, end: int, algorithm: str
+) -> tuple[bytes, int, int]:
+    """Process the lines between the given offsets of a file.
+
+    Runs in the worker processes, which map the file themselves so that only
+    offsets are sent to them. Returns the output lines, the number of
+    records and the number of invalid signatures (for verify)."""
+    output = []
+    invalid_signatures = 0
+    with open(path, "rb") as file, mmap.mmap(
+        file.fileno(), 0, access=mmap.ACCESS_READ
+    ) as mapped_file:
+        position = start
+        while position < end:
+            line_end = mapped_file.find(b"\n", position, end)
+            line_end = end if line_end == -1 else line_end
+            line = mapped_file[position:line_end]
+            line_start, position = position, line_end + 1
+            if not line.strip():
+                # Keep the output lines aligned with the input ones
+                output.append(b"")
+                continue
+            try:
+                record = json.loads(line)
+                if not isinstance(record, dict):
+                    raise RecordError("expected a JSON object")
+                result = process_record(command, record, algorithm)
+            except (ValueError, AttributeError, RecursionError) as e:
+                raise RecordError(f"{path}: byte {line_start}: {e}") from e
+            if command == "verify" and not result["valid"]:
+                invalid_signatures += 1
+            # Serialized like the API responses (NaN and infinities as null)
+            output.append(to_json(result, inf_nan_mode="null"))
+    output_bytes = b"".join(line + b"\n" for line in output)
+    return output_bytes, len(output) - output.count(b""), invalid_signatures
+
+
+def split_file(path: Path, chunk_bytes: int) -> list[tuple[int, int]]:
+    """Split a file into (start, end) offsets of about chunk_bytes,
+    cut at line boundaries."""
+    size = path.stat().st_size
+    if size == 0:
+        return []
+    chunks = []
+    with open(path, "rb") as file, mmap.mmap(
+        file.fileno(), 0, access=mmap.ACCESS_READ
+    ) as mapped_file:
+        start = 0
+        while start < size:
+            line_end = mapped_file.find(b"\n", min(start + chunk_bytes, size) - 1)
+            end = size if line_end == -1 else line_end + 1
+            chunks.append((start, end))
+            start = end
+    return chunks
+
+
+def list_input_files(inputs: list[str]) -> list[Path]:
+    """Expand directories into the NDJSON files they contain (recursively,
+    sorted by name). Files given explicitly are kept whatever their name."""
+    files = []
+    for input_path in map(Path, inputs):
+        if input_path.is_dir():
+            files += sorted(
+                path
+                for path in input_path.rglob("*")
+                if path.is_file() and path.suffix in INPUT_FILE_SUFFIXES
+            )
+        elif input_path.is_file():
+            files.append(input_path)
+        else:
+            raise FileNotFoundError(f"No such file or directory: '{input_path}'")
+    return files
+
+
+def get_output_paths(
+    inputs: list[str], files: list[Path], output: str
+) -> list[Path | None]:
+    """Return the output path of every input file: None for the standard
+    output, the output itself for a single file, otherwise the relative
+    path of the input file inside the output directory."""
+    if output == "-":
+        return [None] * len(files)
+    output_path = Path(output)
+    if len(files) == 1 and Path(inputs[0]).is_file() and not output_path.is_dir():
+        return [output_path]
+
+    output_paths = []
+    for file in files:
+        relative_path = Path(file.name)
+        for input_path in map(Path, inputs):
+            if input_path.is_dir() and file.is_relative_to(input_path):
+                relative_path = file.relative_to(input_path)
+                break
+        output_paths.append(output_path / relative_path)
+    return output_paths
+
+
+def positive_int(value: str) -> int:
+    """Argument type for the options which must be at least 1."""
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"expected a positive integer: '{value}'")
+    return number
+
+
+class ProgressReporter:
+    """Report the progress and throughput on the standard error."""
+
+    def __init__(self, total_bytes: int, enabled: bool = True):
+        self.total_bytes = total_bytes
+        self.enabled = enabled
+        self.processed_bytes = 0
+        self.records = 0
+        self.start = self.last_report = time.perf_counter()
+
+    def update(self, processed_bytes: int, records: int) -> None:
+        self.processed_bytes += processed_bytes
+        self.records += records
+        now = time.perf_counter()
+        if self.enabled and now - self.last_report >= PROGRESS_INTERVAL:
+            self.last_report = now
+            print("\r" + self.describe(), end="", file=sys.stderr, flush=True)
+
+    def finish(self) -> None:
+        if self.enabled:
+            print("\r" + self.describe(), file=sys.stderr, flush=True)
+
+    def describe(self) -> str:
+        elapsed = max(time.perf_counter() - self.start, 1e-9)
+        percentage = 100 * self.processed_bytes / self.total_bytes
+        return (
+            f"{percentage:5.1f}% | {self.records} records"
+            f" | {self.records / elapsed:.0f} records/s"
+            f" | {self.processed_bytes / elapsed / 1e6:.1f} MB/s"
+        )
+
+
+def run(args: argparse.Namespace) -> int:
+    """Run the command on all the input files and return the exit code."""
+    files = list_input_files(args.inputs)
+    output_paths = get_output_paths(args.inputs, files, args.output)
+    resolved_files = {file.resolve() for file in files}
+    resolved_outputs = set()
+    for path in filter(None, output_paths):
+        if path.resolve() in resolved_files:
+            raise FileExistsError(f"Output would overwrite an input: '{path}'")
+        # Files given explicitly are written by name, which may collide
+        if path.resolve() in resolved_outputs:
+            raise FileExistsError(f"Several inputs would be written to '{path}'")
+        resolved_outputs.add(path.resolve())
+    chunks = [
+        (file, output_path, start, end)
+        for file, output_path in zip(files, output_paths)
+        for start, end in split_file(file, args.chunk_bytes)
+    ]
+    total_bytes = sum(end - start for _, _, start, end in chunks) or 1
+    workers = args.workers or os.cpu_count() or 1
+    progress = ProgressReporter(total_bytes, enabled=not args.quiet)
+    invalid_signatures = 0
+    pending = deque()  # Futures in input order, so that output stays ordered
+    output_path, output_file = None, sys.stdout.buffer
+
+    def write_next_result() -> None:
+        nonlocal invalid_signatures, output_path, output_file
+        chunk_output_path, size, future = pending.popleft()
+        output_bytes, records, invalid = future.result()
+        # Output files are written one after the other, in input order
+        if chunk_output_path != output_path:
+            if output_path is not None:
+                output_file.close()
+            output_path, output_file = chunk_output_path, open(chunk_output_path, "wb")
+        output_file.write(output_bytes)
+        invalid_signatures += invalid
+        progress.update(size, records)
+
+    # Create all the output files first, so that empty inputs get one too
+    for path in filter(None, output_paths):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.touch()
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            try:
+                for file, chunk_output_path, start, end in chunks:
+                    future = executor.submit(
+                        process_chunk,
+                        args.command,
+                        str(file),
+                        start,
+                        end,
+                        args.algorithm,
+                    )
+                    pending.append((chunk_output_path, end - start, future))
+                    # Bound the results waiting to be written
+                    if len(pending) >= 4 * workers:
+                        write_next_result()
+                while pending:
+                    write_next_result()
+            except BaseException:
+                # Stop at the first error instead of processing the chunks
+                # still pending, whose results would be thrown away
+                executor.shutdown(cancel_futures=True)
+                raise
+    finally:
+        if output_path is not None:
+            output_file.close()
+    progress.finish()
+
+    if invalid_signatures:
+        print(f"{invalid_signatures} invalid signature(s)", file=sys.stderr)
+        return 1
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m app.cli",
+        description="Encrypt, decrypt, sign or verify NDJSON files in bulk.",
+    )
+    parser.add_argument("command", choices=COMMANDS)
+    parser.add_argument(
+        "inputs", nargs="+", help="NDJSON files or directories containing them"
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        default="-",
+        help="output file, or directory for several inputs (default: stdout)",
+    )
+    parser.add_argument(
+        "--algorithm",
+        choices=sorted(SIGNING_STRATEGIES),
+        default=DEFAULT_SIGNING_ALGORITHM,
+        help="signing algorithm for the sign command",
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=positive_int,
+        default=os.cpu_count(),
+        help="number of worker processes (default: number of CPUs)",
+    )
+    parser.add_argument(
+        "--chunk-bytes",
+        type=positive_int,
+        default=DEFAULT_CHUNK_BYTES,
+        help="approximate size of the chunks sent to the workers",
+    )
+    parser.add_argument(
+        "-q", "--quiet", action="store_true", help="do not report progress"
+    )
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    try:
+        return run(args)
+    except (OSError, RecordError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
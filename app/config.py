@@ -1 +1,33 @@
 SIGNING_KEY = b"sample_key"
+
+# Admission control: maximum number of requests processed at the same time,
+# per endpoint and per request class (see app/core/admission.py)
+ADMISSION_LIMITS = {
+    "/encrypt": {"light": 16, "heavy": 2},
+    "/decrypt": {"light": 16, "heavy": 2},
+    "/sign": {"light": 16, "heavy": 2},
+    "/verify": {"light": 16, "heavy": 2},
+}
+ADMISSION_QUEUE_SIZE = 64  # Maximum number of waiting requests per limiter
+ADMISSION_QUEUE_TIME_TARGET = 0.5  # Seconds before a waiting request is shed
+ADMISSION_HEAVY_REQUEST_BYTES = 64 * 1024  # Bigger request bodies are "heavy"
+
+# Output of /encrypt and /decrypt buffered before streaming the response
+# (smaller invalid bodies still get a 422, see app/endpoints.py)
+STREAMING_BUFFER_BYTES = 64 * 1024
+
+# Micro-batching of /sign and /verify (see app/core/batching.py): requests
+# arriving within the window are processed together by a single worker
+BATCHING_ENABLED = False
+BATCHING_WINDOW = 0.002  # Seconds added at most to the latency of a request
+# Maximum number of requests in a batch. No more requests than the light
+# admission limit of the endpoint (ADMISSION_LIMITS) can be waiting for a
+# batch at the same time, so the batch size is capped at that limit: a batch
+# which can never fill up would make every request wait the whole window.
+BATCHING_MAX_SIZE = 16
+
+# Maximum number of payload shapes (key sets) whose canonical key order is
+# cached for signing (see app/core/utils.py), and maximum number of keys of
+# a cached shape, which bounds the memory used by the cache
+CANONICALIZATION_CACHE_SIZE = 4096
+CANONICALIZATION_MAX_KEYS = 1024
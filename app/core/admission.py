@@ -0,0 +1,230 @@
+import asyncio
+from collections import deque
+import json
+import math
+import time
+
+from app.core.metrics import Histogram
+
+LIGHT = "light"
+HEAVY = "heavy"
+SERVICE_TIME_SMOOTHING = 0.2  # Weight of the last request in the average
+
+
+class RequestShed(Exception):
+    """Raised when a request cannot be admitted and must be rejected."""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class ConcurrencyLimiter:
+    """Limit the number of requests processed at the same time, with a
+    bounded FIFO wait queue.
+
+    A request that cannot start immediately waits in the queue for at most
+    `queue_time_target` seconds. It is shed on arrival if the queue is
+    already full, or if its expected wait (from the queue depth and the
+    recent service time) is longer than that, so that it does not wait for
+    nothing. The timeout remains as a backstop for wrong estimates."""
+
+    def __init__(self, max_concurrency: int, queue_size: int, queue_time_target: float):
+        self.max_concurrency = max_concurrency
+        self.queue_size = queue_size
+        self.queue_time_target = queue_time_target
+        self.in_flight = 0
+        self.waiters = deque()
+        self.admitted = 0
+        self.shed = {"queue_full": 0, "expected_wait": 0, "queue_timeout": 0}
+        self.wait_time = Histogram()
+        # Moving average of the time requests hold a slot, None until the
+        # first one is released
+        self.service_time = None
+
+    async def acquire(self) -> float:
+        """Wait for a free slot, or raise RequestShed. Return the time at
+        which the request was admitted, to be given back to release()."""
+        if self.in_flight < self.max_concurrency and not self.waiters:
+            self.in_flight += 1
+            self.record_admission(0.0)
+            return time.perf_counter()
+        if len(self.waiters) >= self.queue_size:
+            self.shed["queue_full"] += 1
+            raise RequestShed("queue_full")
+        if self.estimate_wait() > self.queue_time_target:
+            self.shed["expected_wait"] += 1
+            raise RequestShed("expected_wait")
+
+        start = time.perf_counter()
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters.append(waiter)
+        try:
+            await asyncio.wait({waiter}, timeout=self.queue_time_target)
+        except BaseException:
+            # The client went away while waiting: give back the slot if it
+            # was already handed over, otherwise leave the queue.
+            if waiter.done():
+                self.release()
+            else:
+                self.abandon(waiter)
+            raise
+        # The slot is handed over by release(), so a request that got it
+        # at the last moment is admitted even if the timeout expired.
+        if not waiter.done():
+            self.abandon(waiter)
+            self.shed["queue_timeout"] += 1
+            raise RequestShed("queue_timeout")
+        admitted_at = time.perf_counter()
+        self.record_admission(admitted_at - start)
+        return admitted_at
+
+    def release(self, admitted_at: float | None = None) -> None:
+        """Free a slot, handing it over to the oldest waiting request.
+
+        The time returned by acquire() updates the average service time."""
+        if admitted_at is not None:
+            self.record_service_time(time.perf_counter() - admitted_at)
+        while self.waiters:
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+    def abandon(self, waiter: asyncio.Future) -> None:
+        waiter.cancel()
+        self.waiters.remove(waiter)
+
+    def record_admission(self, wait_time: float) -> None:
+        self.admitted += 1
+        self.wait_time.observe(wait_time)
+
+    def record_service_time(self, service_time: float) -> None:
+        if self.service_time is None:
+            self.service_time = service_time
+        else:
+            self.service_time += SERVICE_TIME_SMOOTHING * (
+                service_time - self.service_time
+            )
+
+    def estimate_wait(self) -> float:
+        """Estimate the wait of a request joining the queue now: a slot
+        frees up every service_time / max_concurrency seconds on average,
+        and the requests already queued get the first ones."""
+        if self.service_time is None:
+            return 0.0
+        return (
+            (len(self.waiters) + 1) * self.service_time / max(self.max_concurrency, 1)
+        )
+
+    def stats(self) -> dict:
+        """Return a JSON-compatible view of the limiter state."""
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "queue_depth": len(self.waiters),
+            "admitted": self.admitted,
+            "shed": dict(self.shed),
+            "service_time": self.service_time,
+            "estimated_wait": self.estimate_wait(),
+            "wait_time": self.wait_time.snapshot(),
+        }
+
+
+class AdmissionController:
+    """Keep one ConcurrencyLimiter per endpoint and per request class.
+
+    Requests are classified as heavy when their body is bigger than
+    `heavy_request_bytes` (or of unknown size), so that cheap requests never
+    wait behind heavy ones of the same endpoint."""
+
+    def __init__(
+        self,
+        limits: dict,
+        queue_size: int,
+        queue_time_target: float,
+        heavy_request_bytes: int,
+    ):
+        self.queue_time_target = queue_time_target
+        self.heavy_request_bytes = heavy_request_bytes
+        self.limiters = {
+            (path, request_class): ConcurrencyLimiter(
+                max_concurrency, queue_size, queue_time_target
+            )
+            for path, endpoint_limits in limits.items()
+            for request_class, max_concurrency in endpoint_limits.items()
+        }
+
+    def get_limiter(
+        self, path: str, content_length: int | None
+    ) -> ConcurrencyLimiter | None:
+        """Return the limiter for the given request, or None if its endpoint
+        is not limited."""
+        if content_length is not None and content_length <= self.heavy_request_bytes:
+            request_class = LIGHT
+        else:
+            request_class = HEAVY
+        return self.limiters.get((path, request_class))
+
+    def stats(self) -> dict:
+        """Return a JSON-compatible view of all the limiters."""
+        stats = {}
+        for (path, request_class), limiter in self.limiters.items():
+            stats.setdefault(path, {})[request_class] = limiter.stats()
+        return stats
+
+
+class AdmissionMiddleware:
+    """ASGI middleware admitting requests through an AdmissionController.
+
+    Shed requests get a 503 response with a Retry-After header instead of
+    waiting behind the threadpool."""
+
+    def __init__(self, app, controller: AdmissionController):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        limiter = self.controller.get_limiter(scope["path"], get_content_length(scope))
+        if limiter is None:
+            return await self.app(scope, receive, send)
+
+        try:
+            admitted_at = await limiter.acquire()
+        except RequestShed as shed:
+            return await self.send_unavailable(send, shed.reason)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release(admitted_at)
+
+    async def send_unavailable(self, send, reason: str) -> None:
+        body = json.dumps({"detail": "Service overloaded", "reason": reason})
+        retry_after = max(1, math.ceil(self.controller.queue_time_target))
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode("latin-1")),
+                    (b"retry-after", str(retry_after).encode("latin-1")),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body.encode("utf-8")})
+
+
+def get_content_length(scope) -> int | None:
+    """Read the Content-Length header of an ASGI scope, if any."""
+    for name, value in scope["headers"]:
+        if name == b"content-length":
+            try:
+                return int(value)
+            except ValueError:
+                return None
+    return None
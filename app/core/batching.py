@@ -0,0 +1,105 @@
+import asyncio
+import time
+from typing import Any, Callable
+
+from starlette.concurrency import run_in_threadpool
+
+from app.core.metrics import Histogram
+
+
+class MicroBatcher:
+    """Coalesce concurrent calls of a function into batches.
+
+    Items submitted within `window` seconds of the first one of a batch (or
+    until `max_batch_size` items are collected) are processed together by a
+    single worker thread, which calls the function in a tight loop. Each
+    caller then gets its own result (or exception) back. This trades a
+    bounded amount of latency (at most the window) for fewer threadpool
+    hops per request."""
+
+    def __init__(
+        self, process: Callable[[Any], Any], window: float, max_batch_size: int
+    ):
+        self.process = process
+        self.window = window
+        self.max_batch_size = max_batch_size
+        self.pending = []  # (item, future, submission time) of the next batch
+        self.flush_handle = None
+        self.running_batches = set()
+        # Powers of two below the maximum, then the maximum for full batches
+        powers_of_two = range((max_batch_size - 1).bit_length())
+        self.batch_size = Histogram(
+            tuple(2**i for i in powers_of_two) + (max_batch_size,)
+        )
+        self.added_wait = Histogram()
+
+    async def submit(self, item: Any) -> Any:
+        """Process the item in the next batch and return its result."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.pending.append((item, future, time.perf_counter()))
+        if len(self.pending) >= self.max_batch_size:
+            self.flush()
+        elif self.flush_handle is None:
+            self.flush_handle = loop.call_later(self.window, self.flush)
+        return await future
+
+    def flush(self) -> None:
+        """Send the pending items to a worker as a batch."""
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+        batch, self.pending = self.pending, []
+        if batch:
+            # Keep a reference to the task so that it is not garbage collected
+            task = asyncio.create_task(self.run_batch(batch))
+            self.running_batches.add(task)
+            task.add_done_callback(self.running_batches.discard)
+
+    async def run_batch(self, batch: list) -> None:
+        start = time.perf_counter()
+        self.batch_size.observe(len(batch))
+        for _, _, submission_time in batch:
+            self.added_wait.observe(start - submission_time)
+
+        try:
+            results = await run_in_threadpool(
+                self.process_batch, [item for item, _, _ in batch]
+            )
+        except BaseException as e:
+            # The batch failed as a whole (e.g. the task was cancelled): fail
+            # every call instead of leaving the callers waiting forever. The
+            # error is theirs from now on, as nobody awaits this task.
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            return
+        for (_, future, _), (succeeded, result) in zip(batch, results):
+            if future.done():  # The caller went away
+                continue
+            if succeeded:
+                future.set_result(result)
+            else:
+                future.set_exception(result)
+
+    def process_batch(self, items: list) -> list[tuple[bool, Any]]:
+        """Process the items one after the other in the worker thread, so
+        that an exception only fails the call of its own item."""
+        results = []
+        for item in items:
+            try:
+                results.append((True, self.process(item)))
+            except Exception as e:
+                results.append((False, e))
+        return results
+
+    def stats(self) -> dict:
+        """Return a JSON-compatible view of the batching statistics."""
+        return {
+            "window": self.window,
+            "max_batch_size": self.max_batch_size,
+            "batch_size": self.batch_size.snapshot(),
+            "added_wait": self.added_wait.snapshot(),
+        }
@@ -0,0 +1,287 @@
+import codecs
+import json
+import re
+from typing import Any, Callable
+
+from pydantic_core import to_json
+
+NON_WHITESPACE = re.compile(r"[^ \t\n\r]")
+STRUCTURAL_CHARACTER = re.compile(r'["{}\[\]]')
+STRING_CONTENT = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*', re.DOTALL)
+KEY_SEPARATOR = re.compile(r"[ \t\n\r]*:[ \t\n\r]*")
+PAIR_SEPARATOR = re.compile(r'[ \t\n\r]*,[ \t\n\r]*(?=")')
+SCALAR_END = re.compile(r'[ \t\n\r,:"{}\[\]]')
+NUMBER_CHARACTERS = set("0123456789+-.eE") | {""}
+JSON_DECODER = json.JSONDecoder()
+
+# States of JSONObjectTokenizer
+EXPECT_OBJECT = "expect_object"
+EXPECT_FIRST_KEY = "expect_first_key"
+EXPECT_KEY = "expect_key"
+IN_KEY = "in_key"
+EXPECT_COLON = "expect_colon"
+EXPECT_VALUE = "expect_value"
+IN_VALUE = "in_value"
+EXPECT_SEPARATOR = "expect_separator"
+DONE = "done"
+
+
+class JSONObjectTokenizer:
+    """Incremental tokenizer splitting a JSON object, received in chunks of
+    UTF-8 bytes, into its first-depth key/value pairs.
+
+    Only the structure of the object is checked here: each key and value is
+    parsed by the json module as soon as its last character is received, so
+    the memory used depends on the biggest value and not on the whole
+    object. Errors are raised like json.loads raises them (JSONDecodeError
+    with the position in the whole document, or UnicodeDecodeError)."""
+
+    def __init__(self):
+        self.state = EXPECT_OBJECT
+        self.utf8_decoder = codecs.getincrementaldecoder("utf-8")()
+        self.buffer = ""
+        self.position = 0  # Position in the buffer of the next character
+        self.offset = 0  # Position in the document of the start of the buffer
+        self.received = False
+        self.key = None
+        # Scanning state of a key or value received in several chunks: its
+        # start is in the buffer and its next chunks are kept in `pending`
+        # until its end is found, so that they are only joined once
+        self.scanning = False
+        self.pending = []
+        self.depth = 0
+        self.in_string = False
+        self.in_scalar = False
+        self.escaped = False
+
+    def feed(self, chunk: bytes) -> list[tuple[str, Any]]:
+        """Add a chunk of the document and return the key/value pairs
+        completed by it."""
+        if chunk:
+            self.received = True
+        text = self.utf8_decoder.decode(chunk)
+        if self.offset == 0 and not self.buffer:
+            text = text.removeprefix("\ufeff")  # Like json.loads on bytes
+
+        pairs = []
+        token_end = None
+        if self.scanning:
+            token_end = self.scan_token(text, 0)
+            self.pending.append(text)
+            if token_end is None:
+                return pairs
+            remaining = len(text) - token_end
+            text = "".join(self.pending)
+            self.pending = []
+
+        # Drop what was already read before adding the new text
+        self.offset += self.position
+        self.buffer = self.buffer[self.position :] + text
+        self.position = 0
+        if token_end is not None:
+            self.scanning = False
+            self.read_scanned_token(len(self.buffer) - remaining, pairs)
+
+        while self.position < len(self.buffer) and self.step(pairs):
+            pass
+        return pairs
+
+    def close(self) -> None:
+        """Check that the whole document was a single JSON object."""
+        self.utf8_decoder.decode(b"", final=True)
+        if self.scanning:
+            try:
+                json.loads(self.buffer[self.position :] + "".join(self.pending))
+            except json.JSONDecodeError as e:
+                self.error(e.msg, e.pos)
+            self.position = len(self.buffer) + sum(map(len, self.pending))
+            if self.state == IN_KEY:
+                self.error("Expecting ':' delimiter")
+            self.error("Expecting ',' delimiter")
+        if self.state != DONE:
+            self.error("Expecting value", len(self.buffer) - self.position)
+
+    def step(self, pairs: list) -> bool:
+        """Advance in the buffer. Return False when more characters are
+        needed."""
+        if self.state in (IN_KEY, IN_VALUE):
+            return self.read_token(pairs)
+
+        character = self.skip_whitespace()
+        if character is None:
+            return False
+        if self.state == EXPECT_OBJECT:
+            self.expect(character, "{", "Expecting '{'", EXPECT_FIRST_KEY)
+        elif self.state == EXPECT_FIRST_KEY and character == "}":
+            self.position += 1
+            self.state = DONE
+        elif self.state in (EXPECT_FIRST_KEY, EXPECT_KEY):
+            if character != '"':
+                self.error("Expecting property name enclosed in double quotes")
+            self.state = IN_KEY
+        elif self.state == EXPECT_COLON:
+            self.expect(character, ":", "Expecting ':' delimiter", EXPECT_VALUE)
+        elif self.state == EXPECT_VALUE:
+            self.state = IN_VALUE
+        elif self.state == EXPECT_SEPARATOR:
+            if character == "}":
+                self.position += 1
+                self.state = DONE
+            else:
+                self.expect(character, ",", "Expecting ',' delimiter", EXPECT_KEY)
+        else:
+            self.error("Extra data")
+        return True
+
+    def skip_whitespace(self) -> str | None:
+        """Skip the whitespace at the current position and return the next
+        character, or None if the end of the buffer was reached."""
+        match = NON_WHITESPACE.search(self.buffer, self.position)
+        if match is None:
+            self.position = len(self.buffer)
+            return None
+        self.position = match.start()
+        return match.group()
+
+    def expect(self, character: str, expected: str, message: str, state: str):
+        if character != expected:
+            self.error(message)
+        self.position += 1
+        self.state = state
+
+    def read_token(self, pairs: list) -> bool:
+        """Read the key or value at the current position if it is complete,
+        otherwise start scanning it. Return False in the latter case.
+
+        The token is first decoded directly from the buffer, which is the
+        fastest path when it was fully received. Otherwise (or if it is
+        invalid), it is scanned to find its end."""
+        try:
+            parsed_token, end = JSON_DECODER.raw_decode(self.buffer, self.position)
+        except json.JSONDecodeError:
+            pass
+        else:
+            # A number at the end of the buffer could continue in the next chunk
+            if self.buffer[end : end + 1] not in NUMBER_CHARACTERS:
+                self.read_parsed_token(parsed_token, end, pairs)
+                return True
+
+        first_character = self.buffer[self.position]
+        self.depth = 1 if first_character in "{[" else 0
+        self.in_string = first_character == '"'
+        # A scalar is scanned from its first character, so that a missing
+        # value gives an empty token (and the same error as json.loads)
+        self.in_scalar = first_character not in '{["'
+        self.escaped = False
+        start = self.position if self.in_scalar else self.position + 1
+        end = self.scan_token(self.buffer, start)
+        if end is None:
+            self.scanning = True
+            return False
+        self.read_scanned_token(end, pairs)
+        return True
+
+    def read_scanned_token(self, end: int, pairs: list) -> None:
+        """Parse the token ending at the given position of the buffer."""
+        try:
+            parsed_token = json.loads(self.buffer[self.position : end])
+        except json.JSONDecodeError as e:
+            self.error(e.msg, e.pos)
+        self.read_parsed_token(parsed_token, end, pairs)
+
+    def read_parsed_token(self, parsed_token: Any, end: int, pairs: list) -> None:
+        self.position = end
+        if self.state == IN_KEY:
+            self.key = parsed_token
+            self.state = EXPECT_COLON
+            separator, next_state = KEY_SEPARATOR, IN_VALUE
+        else:
+            pairs.append((self.key, parsed_token))
+            self.state = EXPECT_SEPARATOR
+            separator, next_state = PAIR_SEPARATOR, IN_KEY
+        # Skip the usual separator in one go and go straight to the next token
+        match = separator.match(self.buffer, end)
+        if match is not None and match.end() < len(self.buffer):
+            self.position = match.end()
+            self.state = next_state
+
+    def scan_token(self, text: str, position: int) -> int | None:
+        """Scan the text from the given position, and return the end of the
+        token being scanned, or None if it does not end in this text.
+        The scanning state is kept between calls, so that every character
+        is only scanned once."""
+        if self.in_scalar:
+            match = SCALAR_END.search(text, position)
+            return None if match is None else match.start()
+
+        if self.escaped and position < len(text):
+            position += 1
+            self.escaped = False
+        while True:
+            if self.in_string:
+                position = STRING_CONTENT.match(text, position).end()
+                if position == len(text):
+                    return None
+                if text[position] == "\\":
+                    # Backslash at the end of the text, escaping the next one
+                    self.escaped = True
+                    return None
+                self.in_string = False
+                position += 1
+            else:
+                match = STRUCTURAL_CHARACTER.search(text, position)
+                if match is None:
+                    return None
+                position = match.end()
+                character = match.group()
+                if character == '"':
+                    self.in_string = True
+                    continue
+                if character in "{[":
+                    self.depth += 1
+                    continue
+                self.depth -= 1
+            if self.depth == 0:
+                return position
+
+    def error(self, message: str, relative_position: int = 0):
+        """Raise a JSONDecodeError at the given position, relative to the
+        current one."""
+        position = self.offset + self.position + relative_position
+        raise json.JSONDecodeError(message, "", position)
+
+
+class JSONObjectTransformer:
+    """Rebuild a JSON object received in chunks, transforming each of its
+    first-depth values as soon as it is complete.
+
+    The output is serialized like FastAPI serializes the response of a
+    dictionary (NaN and infinities included, written as null), so that it
+    is byte-identical to the non-streamed one.
+    The only exception is a key appearing several times: it is kept
+    several times in the output (the last value still wins when parsed)."""
+
+    def __init__(self, transform: Callable[[Any], Any]):
+        self.transform = transform
+        self.tokenizer = JSONObjectTokenizer()
+        self.started = False
+
+    def feed(self, chunk: bytes) -> bytes:
+        """Add a chunk of the input and return the next chunk of output."""
+        output = []
+        for key, value in self.tokenizer.feed(chunk):
+            output.append(b"," if self.started else b"{")
+            self.started = True
+            value = to_json(self.transform(value), inf_nan_mode="null")
+            output += [to_json(key), b":", value]
+        return b"".join(output)
+
+    def close(self) -> bytes:
+        """Check that the input is complete and return the end of the output."""
+        self.tokenizer.close()
+        return b"}" if self.started else b"{}"
+
+    @property
+    def received(self) -> bool:
+        """Whether any byte of input was received."""
+        return self.tokenizer.received
@@ -1,65 +1,68 @@
 from abc import ABC, abstractmethod
+from enum import Enum
 import hmac, hashlib
-import json
 
 from app.models import SignatureResponse
-from app.core.utils import sort_dict
-from app.config import SIGNING_KEY
+from app.core.utils import CanonicalizationPlanCache, canonical_json
+from app.config import (
+    CANONICALIZATION_CACHE_SIZE,
+    CANONICALIZATION_MAX_KEYS,
+    SIGNING_KEY,
+)
+
+DEFAULT_SIGNING_ALGORITHM = "hmac-sha256"
+SIGNATURE_SEPARATOR = ":"
+
+# Shared by all the strategies, payloads of the same shape share their plan
+canonicalization_plans = CanonicalizationPlanCache(
+    CANONICALIZATION_CACHE_SIZE, CANONICALIZATION_MAX_KEYS
+)
 
 
 class SigningStrategy(ABC):
     """Abstract base class for JSON payload signing strategies.
 
-    Subclasses should implement methods for signing and verifying
-    JSON-compatible dictionaries."""
+    Subclasses should implement the method generating the signature of the
+    canonical bytes of a payload, and give the name of their algorithm."""
 
-    @abstractmethod
-    def sign_json_payload(self, payload: dict) -> SignatureResponse:
-        """Sign the given JSON payload dictionary."""
-        pass
+    algorithm: str
 
     @abstractmethod
-    def is_signature_valid(self, payload: dict, signature: str) -> bool:
-        """Verify if the given signature is valid for the JSON payload."""
+    def generate_signature(self, payload_bytes: bytes) -> str:
+        """Generate the hexadecimal signature for the given payload in bytes."""
         pass
 
-    def unify_payload(self, payload: dict) -> dict:
-        """Returns a unified version of the payload, so that order of
-        attributes is not relevant for signing/verifying. Currently
-        implemented by sorting the dictionary keys at all depths."""
-        return sort_dict(payload)
-
-
-class HMACSigningStrategy(SigningStrategy):
-    """Implementation of SigningStrategy using HMAC as the signing algorithm
-    with SHA256 as the hash function."""
-
     def sign_json_payload(self, payload: dict) -> SignatureResponse:
-        """Sign the given JSON payload dictionary using HMAC,
-        independently of attribute order."""
-        sorted_payload = self.unify_payload(payload)
-        payload_bytes = self.serialize_payload(sorted_payload)
+        """Sign the given JSON payload dictionary, independently of
+        attribute order."""
+        payload_bytes = self.serialize_payload(payload)
         payload_signature = self.generate_signature(payload_bytes)
-        return SignatureResponse(signature=payload_signature)
+        return SignatureResponse(signature=self.describe_signature(payload_signature))
 
     def is_signature_valid(self, payload: dict, signature: str) -> bool:
-        """Verify if the given signature is valid HMAC signature for
-        the JSON payload, independently of attribute order."""
-        sorted_payload = self.unify_payload(payload)
-        payload_bytes = self.serialize_payload(sorted_payload)
+        """Verify if the given signature is valid for the JSON payload,
+        independently of attribute order."""
+        algorithm, digest = parse_signature(signature)
+        if algorithm != self.algorithm:
+            return False
+        payload_bytes = self.serialize_payload(payload)
         expected_signature = self.generate_signature(payload_bytes)
-        return self.compare_signatures(expected_signature, signature)
+        return self.compare_signatures(expected_signature, digest)
 
     def serialize_payload(self, payload: dict) -> bytes:
-        """Serialize the given JSON payload dictionary into bytes."""
-        return json.dumps(payload).encode("utf-8")
+        """Serialize the given JSON payload dictionary into canonical bytes,
+        so that order of attributes is not relevant for signing/verifying.
+        The keys are sorted at all depths, using the cached plan of each
+        frequent dictionary shape instead of sorting them for every payload."""
+        return canonical_json(payload, canonicalization_plans).encode("utf-8")
 
-    def generate_signature(self, payload_bytes: bytes) -> str:
-        """Generate HMAC SHA256 signature for the given payload
-        in bytes using the defined SIGNING_KEY in config.py."""
-        return hmac.new(
-            key=SIGNING_KEY, msg=payload_bytes, digestmod=hashlib.sha256
-        ).hexdigest()
+    def describe_signature(self, digest: str) -> str:
+        """Prefix the digest with the name of the algorithm so that /verify
+        knows which strategy to use. Signatures of the default algorithm
+        are left bare to stay compatible with the ones already issued."""
+        if self.algorithm == DEFAULT_SIGNING_ALGORITHM:
+            return digest
+        return f"{self.algorithm}{SIGNATURE_SEPARATOR}{digest}"
 
     def compare_signatures(self, sig1: str, sig2: str) -> bool:
         """Compare two signatures.
@@ -70,3 +73,78 @@ class HMACSigningStrategy(SigningStrategy):
         (when using ==, the comparison stops at the first different character).
         """
         return hmac.compare_digest(sig1, sig2)
+
+
+class HMACSigningStrategy(SigningStrategy):
+    """Implementation of SigningStrategy using HMAC as the signing algorithm
+    with SHA256 as the hash function."""
+
+    algorithm = "hmac-sha256"
+    digestmod = hashlib.sha256
+
+    def generate_signature(self, payload_bytes: bytes) -> str:
+        """Generate HMAC signature for the given payload
+        in bytes using the defined SIGNING_KEY in config.py."""
+        return hmac.new(
+            key=SIGNING_KEY, msg=payload_bytes, digestmod=self.digestmod
+        ).hexdigest()
+
+
+class HMACSHA512SigningStrategy(HMACSigningStrategy):
+    """Implementation of SigningStrategy using HMAC as the signing algorithm
+    with SHA512 as the hash function."""
+
+    algorithm = "hmac-sha512"
+    digestmod = hashlib.sha512
+
+
+class Blake2bSigningStrategy(SigningStrategy):
+    """Implementation of SigningStrategy using keyed BLAKE2b as the signing
+    algorithm. BLAKE2b supports keying natively, so a single hash pass is
+    enough (HMAC needs two)."""
+
+    algorithm = "blake2b"
+    digest_size = 32
+
+    def generate_signature(self, payload_bytes: bytes) -> str:
+        """Generate keyed BLAKE2b signature for the given payload
+        in bytes using the defined SIGNING_KEY in config.py."""
+        return hashlib.blake2b(
+            payload_bytes, key=SIGNING_KEY, digest_size=self.digest_size
+        ).hexdigest()
+
+
+SIGNING_STRATEGIES = {
+    strategy.algorithm: strategy
+    for strategy in (
+        HMACSigningStrategy(),
+        HMACSHA512SigningStrategy(),
+        Blake2bSigningStrategy(),
+    )
+}
+
+# Algorithms that can be requested from the /sign endpoint, derived from the
+# registry so that a new strategy only has to be registered above
+SigningAlgorithm = Enum(
+    "SigningAlgorithm",
+    {
+        algorithm.upper().replace("-", "_"): algorithm
+        for algorithm in SIGNING_STRATEGIES
+    },
+    type=str,
+)
+
+
+def get_signing_strategy(algorithm: str | None = None) -> SigningStrategy | None:
+    """Return the registered signing strategy for the given algorithm name
+    (the default one if no name is given), or None if it is unknown."""
+    return SIGNING_STRATEGIES.get(algorithm or DEFAULT_SIGNING_ALGORITHM)
+
+
+def parse_signature(signature: str) -> tuple[str, str]:
+    """Split a signature into its algorithm name and its digest.
+    Bare signatures are assumed to use the default algorithm."""
+    algorithm, separator, digest = signature.rpartition(SIGNATURE_SEPARATOR)
+    if not separator:
+        return DEFAULT_SIGNING_ALGORITHM, digest
+    return algorithm, digest
@@ -1,3 +1,9 @@
+from collections import OrderedDict
+import json
+from json.encoder import encode_basestring_ascii
+import threading
+
+
 def sort_dict(obj):
     """Recursively sort dictionary keys at all depths.
     Warning : lists are not sorted, but any dictionaries inside those lists will be sorted.
@@ -8,3 +14,151 @@ def sort_dict(obj):
         return [sort_dict(item) for item in obj]
     else:
         return obj
+
+
+class CanonicalizationPlanCache:
+    """Bounded LRU cache of canonicalization plans, indexed by the key set
+    of a dictionary (its "shape").
+
+    A plan is the sorted keys of the dictionary, each with its JSON fragment
+    already escaped (`"key": ` preceded by `{` or `, `). Payloads of the same
+    shape can then be serialized without sorting or escaping their keys.
+
+    Only the shapes seen twice among the last `max_size` new ones are
+    cached, so that one-off shapes (like maps keyed by IDs) do not evict
+    the frequent ones. Dictionaries with more than `max_keys` keys are never
+    cached, which bounds the memory used by the cache."""
+
+    def __init__(self, max_size: int, max_keys: int):
+        self.max_size = max_size
+        self.max_keys = max_keys
+        self.plans = OrderedDict()
+        # Hashes of the shapes seen once, oldest first
+        self.candidates = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_plan(self, obj: dict) -> tuple:
+        """Return the plan of the given non-empty dictionary."""
+        if len(obj) > self.max_keys:
+            with self.lock:
+                self.misses += 1
+            return make_plan(obj)
+
+        shape = frozenset(obj)
+        with self.lock:
+            plan = self.plans.get(shape)
+            if plan is not None:
+                self.hits += 1
+                self.plans.move_to_end(shape)
+                return plan
+            self.misses += 1
+            shape_hash = hash(shape)
+            if self.candidates.pop(shape_hash, None) is None:
+                self.candidates[shape_hash] = True
+                if len(self.candidates) > self.max_size:
+                    self.candidates.popitem(last=False)
+                return make_plan(obj)
+
+        plan = make_plan(obj)
+        with self.lock:
+            self.plans[shape] = plan
+            if len(self.plans) > self.max_size:
+                self.plans.popitem(last=False)
+                self.evictions += 1
+        return plan
+
+    def stats(self) -> dict:
+        """Return a JSON-compatible view of the cache statistics."""
+        with self.lock:
+            hits, misses = self.hits, self.misses
+            size, evictions = len(self.plans), self.evictions
+        lookups = hits + misses
+        return {
+            "size": size,
+            "max_size": self.max_size,
+            "max_keys": self.max_keys,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "evictions": evictions,
+        }
+
+
+def make_plan(obj: dict) -> tuple:
+    """Return the canonicalization plan of the given non-empty dictionary."""
+    keys = sorted(obj)
+    fragments = ["{" + encode_basestring_ascii(keys[0]) + ": "]
+    fragments += [", " + encode_basestring_ascii(key) + ": " for key in keys[1:]]
+    return tuple(zip(keys, fragments))
+
+
+def canonical_json(obj, plan_cache: CanonicalizationPlanCache) -> str:
+    """Serialize the given JSON value with its dictionary keys sorted at all
+    depths, using cached plans for the dictionaries.
+    The result is the same as json.dumps(sort_dict(obj))."""
+    parts = []
+    append_canonical_json(obj, parts, plan_cache)
+    return "".join(parts)
+
+
+def append_canonical_json(obj, parts: list, plan_cache: CanonicalizationPlanCache):
+    """Append the canonical JSON fragments of the value to parts.
+    The most common types are checked first, and the scalar values of
+    dictionaries inline to save a recursive call for each of them."""
+    obj_type = type(obj)
+    if obj_type is dict:
+        if not obj:
+            parts.append("{}")
+            return
+        append = parts.append
+        for key, fragment in plan_cache.get_plan(obj):
+            append(fragment)
+            value = obj[key]
+            value_type = type(value)
+            if value_type is str:
+                append(encode_basestring_ascii(value))
+            elif value_type is int:
+                append(int.__repr__(value))
+            elif value_type is float:
+                append(float_json(value))
+            elif value_type in JSON_CONSTANTS:
+                append(JSON_CONSTANTS[value_type][value])
+            else:
+                append_canonical_json(value, parts, plan_cache)
+        append("}")
+    elif obj_type is list:
+        if not obj:
+            parts.append("[]")
+            return
+        separator = "["
+        for item in obj:
+            parts.append(separator)
+            append_canonical_json(item, parts, plan_cache)
+            separator = ", "
+        parts.append("]")
+    elif obj_type is str:
+        parts.append(encode_basestring_ascii(obj))
+    elif obj_type is int:
+        parts.append(int.__repr__(obj))
+    elif obj_type is float:
+        parts.append(float_json(obj))
+    elif obj_type in JSON_CONSTANTS:
+        parts.append(JSON_CONSTANTS[obj_type][obj])
+    else:
+        # Subclasses of the JSON types and others
+        parts.append(json.dumps(sort_dict(obj)))
+
+
+# Spelling of the JSON constants, by type then value
+JSON_CONSTANTS = {bool: {True: "true", False: "false"}, type(None): {None: "null"}}
+# Spelling of the special floats by json.dumps (allow_nan=True)
+SPECIAL_FLOATS = {"nan": "NaN", "inf": "Infinity", "-inf": "-Infinity"}
+
+
+def float_json(value: float) -> str:
+    """Serialize a float like json.dumps does."""
+    text = float.__repr__(value)
+    return SPECIAL_FLOATS.get(text, text)
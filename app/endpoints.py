@@ -1,38 +1,222 @@
-from fastapi import APIRouter, HTTPException
+import email.message
+import json
+from typing import Any, Callable
 
+from fastapi import APIRouter, Header, HTTPException, Query, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+
+from app.config import (
+    ADMISSION_LIMITS,
+    BATCHING_ENABLED,
+    BATCHING_MAX_SIZE,
+    BATCHING_WINDOW,
+    STREAMING_BUFFER_BYTES,
+)
+from app.core.admission import LIGHT
+from app.core.batching import MicroBatcher
 from app.core.encryption_strategies import Base64EncryptionStrategy
-from app.core.signing_strategies import HMACSigningStrategy
+from app.core.json_stream import JSONObjectTransformer
+from app.core.signing_strategies import (
+    SigningAlgorithm,
+    SigningStrategy,
+    get_signing_strategy,
+    parse_signature,
+)
 from app.models import SignatureResponse, VerifyRequest
 
 router = APIRouter()
 encryption_strategy = Base64EncryptionStrategy()
-signing_strategy = HMACSigningStrategy()
 
+# The streamed endpoints read the raw body, so their JSON object body is
+# declared here for the OpenAPI documentation
+JSON_OBJECT_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {"application/json": {"schema": {"type": "object"}}},
+    }
+}
 
-@router.post("/encrypt", summary="Encrypt any JSON payload")
-def encrypt(payload: dict) -> dict:
-    """Encrypt all first-depth values in any given JSON payload."""
-    return encryption_strategy.encrypt_json_payload(payload)
+
+@router.post(
+    "/encrypt",
+    response_model=dict,
+    summary="Encrypt any JSON payload",
+    openapi_extra=JSON_OBJECT_BODY,
+)
+async def encrypt(request: Request) -> StreamingResponse:
+    """Encrypt all first-depth values in any given JSON payload.
+    Each value is encrypted and sent as soon as it is received."""
+    return await stream_json_object(request, encryption_strategy.encrypt)
 
 
-@router.post("/decrypt", summary="Decrypt any JSON payload")
-def decrypt(payload: dict) -> dict:
-    """Decrypt all first-depth values in any given JSON payload"""
-    return encryption_strategy.decrypt_json_payload(payload)
+@router.post(
+    "/decrypt",
+    response_model=dict,
+    summary="Decrypt any JSON payload",
+    openapi_extra=JSON_OBJECT_BODY,
+)
+async def decrypt(request: Request) -> StreamingResponse:
+    """Decrypt all first-depth values in any given JSON payload.
+    Each value is decrypted and sent as soon as it is received."""
+    return await stream_json_object(request, encryption_strategy.decrypt)
 
 
 @router.post("/sign", response_model=SignatureResponse, summary="Sign any JSON payload")
-def sign(payload: dict) -> SignatureResponse:
+async def sign(
+    payload: dict,
+    algorithm: SigningAlgorithm | None = Query(None),
+    x_signing_algorithm: SigningAlgorithm | None = Header(None),
+) -> SignatureResponse:
     """Sign any given JSON payload based on its value (order independent)
-    and return its signature."""
-    return signing_strategy.sign_json_payload(payload)
+    and return its signature. The algorithm can be chosen with the
+    `algorithm` query parameter or the `X-Signing-Algorithm` header
+    (HMAC-SHA256 by default)."""
+    requested_algorithm = algorithm or x_signing_algorithm
+    signing_strategy = get_signing_strategy(
+        requested_algorithm.value if requested_algorithm else None
+    )
+    return await run_signing(sign_batcher, sign_payload, (signing_strategy, payload))
 
 
 @router.post(
     "/verify", status_code=204, summary="Verify the signature of any JSON payload"
 )
-def verify(payload: VerifyRequest) -> None:
+async def verify(payload: VerifyRequest) -> None:
     payload_data = payload.data
     payload_signature = payload.signature
-    if not signing_strategy.is_signature_valid(payload_data, payload_signature):
+    algorithm, _ = parse_signature(payload_signature)
+    signing_strategy = get_signing_strategy(algorithm)
+    if signing_strategy is None or not await run_signing(
+        verify_batcher,
+        verify_payload,
+        (signing_strategy, payload_data, payload_signature),
+    ):
         raise HTTPException(status_code=400, detail="Invalid signature")
+
+
+def sign_payload(request: tuple[SigningStrategy, dict]) -> SignatureResponse:
+    signing_strategy, payload = request
+    return signing_strategy.sign_json_payload(payload)
+
+
+def verify_payload(request: tuple[SigningStrategy, dict, str]) -> bool:
+    signing_strategy, payload, signature = request
+    return signing_strategy.is_signature_valid(payload, signature)
+
+
+def get_batch_size(path: str) -> int:
+    """Return the maximum batch size of an endpoint: BATCHING_MAX_SIZE, but
+    no more than the number of light requests admitted at the same time,
+    otherwise a batch could never be full and would always wait the whole
+    window."""
+    limits = ADMISSION_LIMITS.get(path)
+    if limits is None:
+        return BATCHING_MAX_SIZE
+    return max(1, min(BATCHING_MAX_SIZE, limits[LIGHT]))
+
+
+# Coalesce concurrent /sign and /verify requests when batching is enabled
+sign_batcher = verify_batcher = None
+if BATCHING_ENABLED:
+    sign_batcher = MicroBatcher(sign_payload, BATCHING_WINDOW, get_batch_size("/sign"))
+    verify_batcher = MicroBatcher(
+        verify_payload, BATCHING_WINDOW, get_batch_size("/verify")
+    )
+
+
+async def run_signing(
+    batcher: MicroBatcher | None, function: Callable[[Any], Any], request: Any
+) -> Any:
+    """Run the signing function in the threadpool, in a batch if enabled."""
+    if batcher is None:
+        return await run_in_threadpool(function, request)
+    return await batcher.submit(request)
+
+
+async def stream_json_object(
+    request: Request, transform: Callable[[Any], Any]
+) -> StreamingResponse:
+    """Stream the JSON object of the request body back, with each of its
+    first-depth values transformed.
+
+    The output is only streamed once it reaches STREAMING_BUFFER_BYTES, so
+    that invalid bodies smaller than that still get a 422. Errors found
+    later can only interrupt the response, since its status code was
+    already sent."""
+    if not is_json_content_type(request.headers.get("content-type")):
+        raise RequestValidationError(
+            [
+                {
+                    "type": "dict_type",
+                    "loc": ("body",),
+                    "msg": "Input should be a valid dictionary",
+                    "input": None,
+                }
+            ]
+        )
+
+    transformer = JSONObjectTransformer(transform)
+    chunks = request.stream()
+    buffered_output = []
+    buffered_size = 0
+    try:
+        async for chunk in chunks:
+            output = await run_in_threadpool(transformer.feed, chunk)
+            buffered_output.append(output)
+            buffered_size += len(output)
+            if buffered_size >= STREAMING_BUFFER_BYTES:
+                break
+        else:
+            if not transformer.received:
+                raise RequestValidationError(
+                    [
+                        {
+                            "type": "missing",
+                            "loc": ("body",),
+                            "msg": "Field required",
+                            "input": None,
+                        }
+                    ]
+                )
+            buffered_output.append(transformer.close())
+            return Response(b"".join(buffered_output), media_type="application/json")
+    except json.JSONDecodeError as e:
+        raise RequestValidationError(
+            [
+                {
+                    "type": "json_invalid",
+                    "loc": ("body", e.pos),
+                    "msg": "JSON decode error",
+                    "input": {},
+                    "ctx": {"error": e.msg},
+                }
+            ]
+        ) from e
+    except (UnicodeDecodeError, RecursionError) as e:
+        raise HTTPException(
+            status_code=400, detail="There was an error parsing the body"
+        ) from e
+
+    async def stream_output():
+        yield b"".join(buffered_output)
+        async for chunk in chunks:
+            output = await run_in_threadpool(transformer.feed, chunk)
+            if output:
+                yield output
+        yield transformer.close()
+
+    return StreamingResponse(stream_output(), media_type="application/json")
+
+
+def is_json_content_type(content_type: str | None) -> bool:
+    """Check the content type like FastAPI does before parsing a JSON body."""
+    if not content_type:
+        return False
+    message = email.message.Message()
+    message["content-type"] = content_type
+    subtype = message.get_content_subtype()
+    return message.get_content_maintype() == "application" and (
+        subtype == "json" or subtype.endswith("+json")
+    )
@@ -1,6 +1,14 @@
 from fastapi import FastAPI
 
-from app.endpoints import router
+from app.config import (
+    ADMISSION_HEAVY_REQUEST_BYTES,
+    ADMISSION_LIMITS,
+    ADMISSION_QUEUE_SIZE,
+    ADMISSION_QUEUE_TIME_TARGET,
+)
+from app.core.admission import AdmissionController, AdmissionMiddleware
+from app.core.signing_strategies import canonicalization_plans
+from app.endpoints import router, sign_batcher, verify_batcher
 
 app = FastAPI(
     title="Riot Take-Home Test",
@@ -11,9 +19,39 @@ app = FastAPI(
     },
 )
 
+admission_controller = AdmissionController(
+    limits=ADMISSION_LIMITS,
+    queue_size=ADMISSION_QUEUE_SIZE,
+    queue_time_target=ADMISSION_QUEUE_TIME_TARGET,
+    heavy_request_bytes=ADMISSION_HEAVY_REQUEST_BYTES,
+)
+app.add_middleware(AdmissionMiddleware, controller=admission_controller)
+
 app.include_router(router)
 
 
 @app.get("/")
 async def root() -> dict:
     return {"message": "API is running"}
+
+
+@app.get("/admission", summary="Admission control statistics")
+async def admission() -> dict:
+    """Return the concurrency, queue depth, wait time and shed counts of
+    every endpoint and request class."""
+    return admission_controller.stats()
+
+
+@app.get("/batching", summary="Micro-batching statistics")
+async def batching() -> dict:
+    """Return the batch size and added wait histograms of /sign and /verify
+    (empty if batching is disabled)."""
+    batchers = {"/sign": sign_batcher, "/verify": verify_batcher}
+    return {path: batcher.stats() for path, batcher in batchers.items() if batcher}
+
+
+@app.get("/canonicalization", summary="Canonicalization plan cache statistics")
+async def canonicalization() -> dict:
+    """Return the size, hit rate and evictions of the cache of payload
+    shapes used when signing."""
+    return canonicalization_plans.stats()
@@ -0,0 +1,47 @@
+"""Benchmark of the canonical serialization of signed payloads.
+
+Run from the root of the repository with:
+    python -m benchmarks.canonicalization
+
+It prints, for wide events of different value types, the time of the
+canonical serialization with the plan cache against sorting the payload
+(json.dumps(sort_dict(payload))), as the Markdown table of the README."""
+
+import json
+import timeit
+
+from app.core.utils import CanonicalizationPlanCache, canonical_json, sort_dict
+
+EVENT_KEYS = 300
+VALUES = {
+    "str/int": lambda i: i if i % 2 else f"value-{i}",
+    "float": lambda i: i * 0.37,
+    "bool/null": lambda i: None if i % 3 == 0 else i % 2 == 0,
+    "mixed": lambda i: (f"value-{i}", i, i * 0.37, i % 2 == 0, None)[i % 5],
+}
+NUMBER = 2000
+REPEAT = 5
+
+
+def time_serialization(serialize, payload: dict) -> float:
+    """Return the best time, in seconds, to serialize the payload once."""
+    timings = timeit.repeat(lambda: serialize(payload), number=NUMBER, repeat=REPEAT)
+    return min(timings) / NUMBER
+
+
+def main() -> None:
+    cache = CanonicalizationPlanCache(max_size=16, max_keys=EVENT_KEYS)
+    print("| Values | json.dumps(sort_dict()) | canonical_json (cached plan) |")
+    print("|---|---|---|")
+    for label, make_value in VALUES.items():
+        payload = {f"field_{i}": make_value(i) for i in range(EVENT_KEYS)}
+        # Cache the shape, which is cached the second time it is seen
+        for _ in range(2):
+            assert canonical_json(payload, cache) == json.dumps(sort_dict(payload))
+        sorted_time = time_serialization(lambda p: json.dumps(sort_dict(p)), payload)
+        cached_time = time_serialization(lambda p: canonical_json(p, cache), payload)
+        print(f"| {label} | {sorted_time * 1e6:.0f} µs | {cached_time * 1e6:.0f} µs |")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""Benchmark of the registered signing strategies across payload sizes.
+
+Run from the root of the repository with:
+    python -m benchmarks.signing
+
+It prints the time to compute one signature (generate_signature, on an
+already serialized payload) as the Markdown table of the README."""
+
+import os
+import timeit
+
+from app.core.signing_strategies import SIGNING_STRATEGIES
+
+PAYLOAD_SIZES = {"64 B": 64, "1 KiB": 1024, "16 KiB": 16 * 1024, "1 MiB": 1024**2}
+REPEAT = 5
+
+
+def time_signature(strategy, payload_bytes: bytes) -> float:
+    """Return the best time, in seconds, to sign the payload once."""
+    number = max(10, 2_000_000 // (len(payload_bytes) + 256))
+    timings = timeit.repeat(
+        lambda: strategy.generate_signature(payload_bytes),
+        number=number,
+        repeat=REPEAT,
+    )
+    return min(timings) / number
+
+
+def format_time(seconds: float) -> str:
+    microseconds = seconds * 1e6
+    return f"{microseconds:.0f} µs" if microseconds >= 100 else f"{microseconds:.1f} µs"
+
+
+def main() -> None:
+    algorithms = list(SIGNING_STRATEGIES)
+    print("| Payload size | " + " | ".join(algorithms) + " |")
+    print("|" + "---|" * (len(algorithms) + 1))
+    for label, size in PAYLOAD_SIZES.items():
+        payload_bytes = os.urandom(size)
+        timings = [
+            format_time(time_signature(strategy, payload_bytes))
+            for strategy in SIGNING_STRATEGIES.values()
+        ]
+        print(f"| {label} | " + " | ".join(timings) + " |")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+import asyncio
+import time
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+import pytest
+
+from app.main import app
+from app.core.admission import (
+    AdmissionController,
+    AdmissionMiddleware,
+    ConcurrencyLimiter,
+    RequestShed,
+)
+
+client = TestClient(app)
+
+
+def make_client(limits: dict, queue_size: int = 0) -> TestClient:
+    """Build a client for a minimal app protected by an AdmissionController."""
+    limited_app = FastAPI()
+    controller = AdmissionController(
+        limits=limits,
+        queue_size=queue_size,
+        queue_time_target=0.01,
+        heavy_request_bytes=10,
+    )
+    limited_app.add_middleware(AdmissionMiddleware, controller=controller)
+
+    @limited_app.post("/work")
+    def work(payload: dict) -> dict:
+        return payload
+
+    return TestClient(limited_app)
+
+
+def test_admission_stats():
+    client.post("/sign", json={"message": "Hello World"})
+    response = client.get("/admission")
+    assert response.status_code == 200
+    sign_stats = response.json()["/sign"]["light"]
+    assert sign_stats["admitted"] >= 1
+    assert sign_stats["in_flight"] == 0
+    assert sign_stats["queue_depth"] == 0
+
+
+def test_admission_shed_returns_503():
+    limited_client = make_client({"/work": {"light": 0, "heavy": 0}})
+    response = limited_client.post("/work", json={"a": 1})
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+    assert response.json()["reason"] == "queue_full"
+
+
+def test_admission_heavy_requests_limited_separately():
+    limited_client = make_client({"/work": {"light": 1, "heavy": 0}})
+    light_response = limited_client.post("/work", json={"a": 1})
+    heavy_response = limited_client.post("/work", json={"a": "x" * 100})
+    assert light_response.status_code == 200
+    assert heavy_response.status_code == 503
+
+
+def test_admission_unlimited_endpoint():
+    limited_client = make_client({"/other": {"light": 0, "heavy": 0}})
+    response = limited_client.post("/work", json={"a": 1})
+    assert response.status_code == 200
+
+
+def test_limiter_queue_timeout():
+    async def scenario():
+        limiter = ConcurrencyLimiter(1, queue_size=1, queue_time_target=0.01)
+        await limiter.acquire()
+        with pytest.raises(RequestShed):
+            await limiter.acquire()
+        assert limiter.shed["queue_timeout"] == 1
+        assert limiter.stats()["queue_depth"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_limiter_hands_slot_to_waiter():
+    async def scenario():
+        limiter = ConcurrencyLimiter(1, queue_size=1, queue_time_target=1.0)
+        await limiter.acquire()
+        waiting = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        assert limiter.stats()["queue_depth"] == 1
+        with pytest.raises(RequestShed):
+            await limiter.acquire()  # The queue is full
+        limiter.release()
+        await waiting
+        assert limiter.in_flight == 1
+        limiter.release()
+        assert limiter.in_flight == 0
+        assert limiter.admitted == 2
+        assert limiter.shed["queue_full"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_limiter_sheds_on_expected_wait():
+    async def scenario():
+        limiter = ConcurrencyLimiter(1, queue_size=10, queue_time_target=0.5)
+        admitted_at = await limiter.acquire()
+        limiter.release(admitted_at - 0.3)  # The request took 0.3s
+        assert limiter.service_time == pytest.approx(0.3, abs=0.05)
+
+        await limiter.acquire()
+        waiting = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        # One request queued already: the next one would wait about 0.6s,
+        # so it is shed right away instead of timing out
+        start = time.perf_counter()
+        with pytest.raises(RequestShed) as shed:
+            await limiter.acquire()
+        assert shed.value.reason == "expected_wait"
+        assert time.perf_counter() - start < 0.1
+        assert limiter.stats()["estimated_wait"] > 0.5
+
+        limiter.release()
+        limiter.release(await waiting)
+        assert limiter.in_flight == 0
+        assert limiter.shed == {"queue_full": 0, "expected_wait": 1, "queue_timeout": 0}
+
+    asyncio.run(scenario())
@@ -0,0 +1,142 @@
+import asyncio
+import gc
+import time
+from fastapi.testclient import TestClient
+import pytest
+
+from app import endpoints
+from app.config import ADMISSION_LIMITS, BATCHING_MAX_SIZE
+from app.core.admission import LIGHT
+from app.main import app
+from app.core.batching import MicroBatcher
+from app.endpoints import get_batch_size
+from app.core.signing_strategies import HMACSigningStrategy
+
+client = TestClient(app)
+
+
+def test_batcher_coalesces_concurrent_calls():
+    async def scenario():
+        batches = []
+        batcher = MicroBatcher(lambda x: x * 2, window=0.05, max_batch_size=10)
+        original_process_batch = batcher.process_batch
+
+        def process_batch(items):
+            batches.append(items)
+            return original_process_batch(items)
+
+        batcher.process_batch = process_batch
+        results = await asyncio.gather(*(batcher.submit(i) for i in range(5)))
+        assert results == [0, 2, 4, 6, 8]
+        assert batches == [[0, 1, 2, 3, 4]]
+        assert batcher.stats()["batch_size"]["count"] == 1
+        assert batcher.stats()["added_wait"]["count"] == 5
+
+    asyncio.run(scenario())
+
+
+def test_batcher_max_batch_size():
+    async def scenario():
+        # A long window: batches can only be sent because they are full
+        batcher = MicroBatcher(lambda x: x, window=60, max_batch_size=2)
+        results = await asyncio.gather(*(batcher.submit(i) for i in range(4)))
+        assert results == [0, 1, 2, 3]
+        assert batcher.stats()["batch_size"]["buckets"]["2"] == 2
+
+    asyncio.run(scenario())
+
+
+def test_batcher_exception_only_fails_its_item():
+    async def scenario():
+        batcher = MicroBatcher(lambda x: 1 / x, window=0.01, max_batch_size=10)
+        results = await asyncio.gather(
+            batcher.submit(1), batcher.submit(0), return_exceptions=True
+        )
+        assert results[0] == 1
+        assert isinstance(results[1], ZeroDivisionError)
+
+    asyncio.run(scenario())
+
+
+def test_batcher_failed_batch_fails_every_call():
+    def fail(items):
+        raise RuntimeError("worker failure")
+
+    async def scenario():
+        batcher = MicroBatcher(lambda x: x, window=0.01, max_batch_size=10)
+        batcher.process_batch = fail
+        loop_errors = []
+        asyncio.get_running_loop().set_exception_handler(
+            lambda loop, context: loop_errors.append(context)
+        )
+        results = await asyncio.gather(
+            batcher.submit(1), batcher.submit(2), return_exceptions=True
+        )
+        assert all(isinstance(result, RuntimeError) for result in results)
+        # The batch task itself ends cleanly: no "exception never retrieved"
+        await asyncio.sleep(0)
+        gc.collect()
+        assert loop_errors == []
+
+    asyncio.run(scenario())
+
+
+def test_batcher_full_batches_counted():
+    async def scenario():
+        batcher = MicroBatcher(lambda x: x, window=60, max_batch_size=3)
+        await asyncio.gather(*(batcher.submit(i) for i in range(6)))
+        snapshot = batcher.stats()["batch_size"]
+        assert snapshot["buckets"]["3"] == 2
+        assert snapshot["buckets"]["+Inf"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_batcher_cancelled_batch_does_not_hang():
+    async def scenario():
+        batcher = MicroBatcher(time.sleep, window=0, max_batch_size=1)
+        submitted = asyncio.create_task(batcher.submit(0.05))
+        await asyncio.sleep(0.01)
+        for task in batcher.running_batches:
+            task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await asyncio.wait_for(submitted, timeout=1)
+
+    asyncio.run(scenario())
+
+
+def test_batch_size_capped_at_admission_limit():
+    assert get_batch_size("/sign") <= ADMISSION_LIMITS["/sign"][LIGHT]
+    assert get_batch_size("/verify") <= ADMISSION_LIMITS["/verify"][LIGHT]
+    assert get_batch_size("/unlimited") == BATCHING_MAX_SIZE
+
+
+def test_batching_disabled_stats():
+    response = client.get("/batching")
+    assert response.status_code == 200
+    assert response.json() == {}
+
+
+@pytest.fixture
+def batching_enabled(monkeypatch):
+    sign_batcher = MicroBatcher(endpoints.sign_payload, 0.001, 8)
+    verify_batcher = MicroBatcher(endpoints.verify_payload, 0.001, 8)
+    monkeypatch.setattr(endpoints, "sign_batcher", sign_batcher)
+    monkeypatch.setattr(endpoints, "verify_batcher", verify_batcher)
+    return sign_batcher, verify_batcher
+
+
+def test_sign_then_verify_batched(batching_enabled):
+    sign_batcher, verify_batcher = batching_enabled
+    payload = {"message": "Hello World", "timestamp": 1616161616}
+    sign_response = client.post("/sign", json=payload)
+    assert sign_response.status_code == 200
+    expected = HMACSigningStrategy().sign_json_payload(payload)
+    assert sign_response.json() == expected.model_dump()
+
+    request_body = {"data": payload, "signature": expected.signature}
+    assert client.post("/verify", json=request_body).status_code == 204
+    request_body["data"] = {"message": "Tampered"}
+    assert client.post("/verify", json=request_body).status_code == 400
+    assert sign_batcher.stats()["batch_size"]["count"] == 1
+    assert verify_batcher.stats()["batch_size"]["count"] == 2
@@ -0,0 +1,94 @@
+import json
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.core.utils import CanonicalizationPlanCache, canonical_json, sort_dict
+
+client = TestClient(app)
+
+
+def test_canonical_json_same_as_sorted_dumps():
+    payload = {
+        "name": 'John "Doe" é😀',
+        "age": 30,
+        "height": 1.85,
+        "ratio": float("nan"),
+        "alive": True,
+        "spouse": None,
+        "contact": {"phone": "123-456-7890", "email": "john@example.com"},
+        "items": [1, "2", [3, 4], {"key": "value", "другой": False}, []],
+        "empty": {},
+    }
+    cache = CanonicalizationPlanCache(max_size=16, max_keys=16)
+    assert canonical_json(payload, cache) == json.dumps(sort_dict(payload))
+
+
+def test_canonical_json_scalars_same_as_sorted_dumps():
+    scalars = [0.1, -0.0, 1e300, 1e-7, float("inf"), float("-inf"), float("nan")]
+    scalars += [True, False, None, 10**30, -1, "", "\u2028"]
+    payload = {f"key_{i}": value for i, value in enumerate(scalars)}
+    payload["list"] = list(scalars)
+    cache = CanonicalizationPlanCache(max_size=16, max_keys=16)
+    for _ in range(2):  # Without then with a cached plan
+        assert canonical_json(payload, cache) == json.dumps(sort_dict(payload))
+    for value in scalars:
+        assert canonical_json(value, cache) == json.dumps(value)
+
+
+def test_canonical_json_order_independent():
+    cache = CanonicalizationPlanCache(max_size=16, max_keys=16)
+    payload1 = {"message": "Hello World", "timestamp": 1616161616}
+    payload2 = {"timestamp": 1616161616, "message": "Hello World"}
+    assert canonical_json(payload1, cache) == canonical_json(payload2, cache)
+    assert canonical_json(payload1, cache) == canonical_json(payload2, cache)
+    # Both payloads have the same shape, which is cached once seen twice
+    stats = cache.stats()
+    assert (stats["size"], stats["misses"], stats["hits"]) == (1, 2, 2)
+
+
+def test_plan_cache_eviction():
+    cache = CanonicalizationPlanCache(max_size=2, max_keys=16)
+    for key in ("a", "b", "a", "b"):
+        canonical_json({key: 1}, cache)
+    canonical_json({"a": 2}, cache)  # "a" becomes the most recently used
+    canonical_json({"c": 1}, cache)
+    canonical_json({"c": 2}, cache)  # Caching "c" evicts "b"
+    canonical_json({"a": 3}, cache)
+    stats = cache.stats()
+    assert stats["size"] == 2
+    assert stats["evictions"] == 1
+    assert stats["hits"] == 2
+    assert stats["misses"] == 6
+    assert stats["hit_rate"] == 0.25
+
+
+def test_plan_cache_unique_shapes_do_not_evict_hot_shape():
+    cache = CanonicalizationPlanCache(max_size=4, max_keys=16)
+    hot_payload = {"message": "Hello World", "timestamp": 1616161616}
+    canonical_json(hot_payload, cache)
+    canonical_json(hot_payload, cache)
+    # Nested maps keyed by IDs: every payload brings new shapes
+    for i in range(100):
+        payload = {"users": {f"user-{i}": {"id": i}, f"user-{i + 1000}": {"id": 0}}}
+        assert canonical_json(payload, cache) == json.dumps(sort_dict(payload))
+    hits = cache.stats()["hits"]
+    canonical_json(hot_payload, cache)
+    assert cache.stats()["hits"] == hits + 1
+    assert cache.stats()["evictions"] <= 1
+
+
+def test_plan_cache_skips_wide_dictionaries():
+    cache = CanonicalizationPlanCache(max_size=4, max_keys=2)
+    payload = {"c": 1, "b": 2, "a": 3}
+    for _ in range(3):
+        assert canonical_json(payload, cache) == json.dumps(sort_dict(payload))
+    assert cache.stats()["size"] == 0
+    assert cache.stats()["misses"] == 3
+
+
+def test_canonicalization_stats():
+    for _ in range(2):  # A shape is cached the second time it is seen
+        client.post("/sign", json={"message": "Hello World", "timestamp": 1616161616})
+    response = client.get("/canonicalization")
+    assert response.status_code == 200
+    assert response.json()["size"] >= 1
@@ -0,0 +1,149 @@
+import base64
+import json
+
+import pytest
+
+from app.cli import main
+from app.core.signing_strategies import HMACSigningStrategy
+
+
+def toBase64(s):
+    s = json.dumps(s).encode("utf-8")
+    return base64.b64encode(s).decode("utf-8")
+
+
+def write_ndjson(path, records):
+    path.write_text("".join(json.dumps(record) + "\n" for record in records))
+
+
+def read_ndjson(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+RECORDS = [
+    {"id": i, "name": "User {}".format(i), "tags": ["a", "b"]} for i in range(200)
+]
+
+
+def test_cli_encrypt_keeps_order(tmp_path):
+    write_ndjson(tmp_path / "records.ndjson", RECORDS)
+    output = tmp_path / "encrypted.ndjson"
+    arguments = ["encrypt", str(tmp_path / "records.ndjson"), "-o", str(output)]
+    assert main(arguments + ["-w", "2", "--chunk-bytes", "100", "-q"]) == 0
+    expected = [{key: toBase64(value) for key, value in r.items()} for r in RECORDS]
+    assert read_ndjson(output) == expected
+
+
+def test_cli_encrypt_then_decrypt(tmp_path):
+    write_ndjson(tmp_path / "records.ndjson", RECORDS)
+    main(["encrypt", str(tmp_path / "records.ndjson"), "-o", str(tmp_path / "e"), "-q"])
+    main(["decrypt", str(tmp_path / "e"), "-o", str(tmp_path / "d"), "-q"])
+    assert read_ndjson(tmp_path / "d") == RECORDS
+
+
+def test_cli_sign_then_verify(tmp_path):
+    write_ndjson(tmp_path / "records.ndjson", RECORDS)
+    main(["sign", str(tmp_path / "records.ndjson"), "-o", str(tmp_path / "s"), "-q"])
+    signatures = read_ndjson(tmp_path / "s")
+    assert (
+        signatures[0]
+        == HMACSigningStrategy().sign_json_payload(RECORDS[0]).model_dump()
+    )
+
+    signed_records = [
+        {"data": record, "signature": signature["signature"]}
+        for record, signature in zip(RECORDS, signatures)
+    ]
+    signed_records[1]["data"]["id"] = -1  # Tampered
+    write_ndjson(tmp_path / "signed.ndjson", signed_records)
+    arguments = ["verify", str(tmp_path / "signed.ndjson"), "-o", str(tmp_path / "v")]
+    assert main(arguments + ["-q"]) == 1
+    results = read_ndjson(tmp_path / "v")
+    assert results[0] == {"valid": True}
+    assert results[1] == {"valid": False}
+
+
+def test_cli_sign_algorithm(tmp_path):
+    write_ndjson(tmp_path / "records.ndjson", RECORDS[:1])
+    arguments = ["sign", str(tmp_path / "records.ndjson"), "-o", str(tmp_path / "s")]
+    main(arguments + ["--algorithm", "blake2b", "-q"])
+    assert read_ndjson(tmp_path / "s")[0]["signature"].startswith("blake2b:")
+
+
+def test_cli_directory(tmp_path):
+    (tmp_path / "input" / "nested").mkdir(parents=True)
+    write_ndjson(tmp_path / "input" / "first.ndjson", RECORDS[:2])
+    write_ndjson(tmp_path / "input" / "nested" / "second.jsonl", RECORDS[2:3])
+    (tmp_path / "input" / "ignored.txt").write_text("not NDJSON")
+    output = tmp_path / "output"
+    assert main(["encrypt", str(tmp_path / "input"), "-o", str(output), "-q"]) == 0
+    assert len(read_ndjson(output / "first.ndjson")) == 2
+    assert len(read_ndjson(output / "nested" / "second.jsonl")) == 1
+    assert not (output / "ignored.txt").exists()
+
+
+def test_cli_invalid_record(tmp_path, capsys):
+    (tmp_path / "records.ndjson").write_text('{"id": 1}\nnot a JSON\n')
+    arguments = ["encrypt", str(tmp_path / "records.ndjson"), "-o", str(tmp_path / "e")]
+    assert main(arguments + ["-q"]) == 2
+    assert "byte 10" in capsys.readouterr().err
+
+
+def test_cli_does_not_overwrite_input(tmp_path):
+    write_ndjson(tmp_path / "records.ndjson", RECORDS)
+    path = str(tmp_path / "records.ndjson")
+    assert main(["encrypt", path, "-o", path, "-q"]) == 2
+    assert read_ndjson(tmp_path / "records.ndjson") == RECORDS
+
+
+def test_cli_same_named_inputs(tmp_path):
+    for directory in ("a", "b"):
+        (tmp_path / directory).mkdir()
+        write_ndjson(tmp_path / directory / "records.ndjson", RECORDS)
+    arguments = [str(tmp_path / "a" / "records.ndjson")]
+    arguments += [str(tmp_path / "b" / "records.ndjson")]
+    output = tmp_path / "output"
+    assert main(["encrypt", *arguments, "-o", str(output), "-q"]) == 2
+    assert not output.exists()
+
+
+def test_cli_rejects_non_positive_options(tmp_path, capsys):
+    write_ndjson(tmp_path / "records.ndjson", RECORDS)
+    path = str(tmp_path / "records.ndjson")
+    for option in (["-w", "-1"], ["-w", "0"], ["--chunk-bytes", "0"]):
+        with pytest.raises(SystemExit) as exit_info:
+            main(["encrypt", path, "-q", *option])
+        assert exit_info.value.code == 2
+        assert "expected a positive integer" in capsys.readouterr().err
+
+
+def test_cli_decrypt_does_not_count_invalid_signatures(tmp_path):
+    write_ndjson(tmp_path / "records.ndjson", [{"valid": toBase64(False)}])
+    output = tmp_path / "decrypted.ndjson"
+    arguments = ["decrypt", str(tmp_path / "records.ndjson"), "-o", str(output)]
+    assert main(arguments + ["-q"]) == 0
+    assert read_ndjson(output) == [{"valid": False}]
+
+
+def test_cli_blank_lines_keep_alignment(tmp_path):
+    (tmp_path / "records.ndjson").write_text('{"a": 1}\n\n{"b": 2}\n')
+    output = tmp_path / "encrypted.ndjson"
+    arguments = ["encrypt", str(tmp_path / "records.ndjson"), "-o", str(output)]
+    assert main(arguments + ["-q"]) == 0
+    lines = output.read_text().split("\n")
+    assert lines == ['{"a":"MQ=="}', "", '{"b":"Mg=="}', ""]
+
+
+def test_cli_decrypt_nan_as_null(tmp_path):
+    write_ndjson(tmp_path / "records.ndjson", [{"a": toBase64(float("nan"))}])
+    output = tmp_path / "decrypted.ndjson"
+    arguments = ["decrypt", str(tmp_path / "records.ndjson"), "-o", str(output)]
+    assert main(arguments + ["-q"]) == 0
+    assert output.read_text() == '{"a":null}\n'
+
+
+def test_cli_deeply_nested_record(tmp_path, capsys):
+    (tmp_path / "records.ndjson").write_text('{"a": ' + "[" * 100000 + "\n")
+    arguments = ["encrypt", str(tmp_path / "records.ndjson"), "-o", str(tmp_path / "e")]
+    assert main(arguments + ["-q"]) == 2
+    assert "byte 0" in capsys.readouterr().err
@@ -185,3 +185,31 @@ def test_mixed_encrypted_and_unecrypted_values():
         "phone": "123-456-7890",
     }
     assert decrypted_data.get("birth_date") == "1998-11-19"
+
+
+def test_decryption_invalid_json():
+    response = client.post(
+        "/decrypt",
+        content='{"name": "Sm9obiBEb2U="',
+        headers={"content-type": "application/json"},
+    )
+    assert response.status_code == 422
+
+
+def test_decryption_streamed_body():
+    payload = {"name": toBase64("John Doe"), "birth_date": "1998-11-19"}
+    body = json.dumps(payload).encode("utf-8")
+    chunks = (body[i : i + 3] for i in range(0, len(body), 3))
+    response = client.post(
+        "/decrypt", content=chunks, headers={"content-type": "application/json"}
+    )
+    assert response.status_code == 200
+    assert response.json() == {"name": "John Doe", "birth_date": "1998-11-19"}
+
+
+def test_decryption_nan_and_infinity_values():
+    # Decrypted NaN and infinities are not valid JSON: written as null
+    payload = {"a": toBase64(float("nan")), "b": "MWU0MDA=", "c": "plain"}
+    response = client.post("/decrypt", json=payload)
+    assert response.status_code == 200
+    assert response.content == b'{"a":null,"b":null,"c":"plain"}'
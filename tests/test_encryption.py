@@ -90,3 +90,47 @@ def test_encryption_maintains_order():
     encrypted_data = response.json()
     keys = list(encrypted_data.keys())
     assert keys == ["name", "age", "contact"]
+
+
+def test_encryption_invalid_json():
+    response = client.post(
+        "/encrypt",
+        content='{"name": "John Doe", "age": }',
+        headers={"content-type": "application/json"},
+    )
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["type"] == "json_invalid"
+
+
+def test_encryption_not_an_object():
+    response = client.post("/encrypt", json=[1, 2, 3])
+    assert response.status_code == 422
+
+
+def test_encryption_streamed_body():
+    payload = {
+        "name": "John Doe",
+        "contact": {"email": "john@example.com", "phone": "123-456-7890"},
+    }
+    body = json.dumps(payload).encode("utf-8")
+    chunks = (body[i : i + 3] for i in range(0, len(body), 3))
+    response = client.post(
+        "/encrypt", content=chunks, headers={"content-type": "application/json"}
+    )
+    assert response.status_code == 200
+    assert response.json() == {key: toBase64(value) for key, value in payload.items()}
+
+
+def test_encryption_compact_output():
+    payload = {"name": "Jöhn Doe", "age": 30}
+    response = client.post("/encrypt", json=payload)
+    assert response.status_code == 200
+    expected = {key: toBase64(value) for key, value in payload.items()}
+    assert response.content == json.dumps(expected, separators=(",", ":")).encode()
+
+
+def test_encryption_large_streamed_payload():
+    payload = {"key{}".format(i): "value {}".format(i) * 20 for i in range(2000)}
+    response = client.post("/encrypt", json=payload)
+    assert response.status_code == 200
+    assert response.json() == {key: toBase64(value) for key, value in payload.items()}
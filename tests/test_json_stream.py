@@ -0,0 +1,75 @@
+import json
+import pytest
+
+from app.core.json_stream import JSONObjectTokenizer, JSONObjectTransformer
+
+
+def tokenize(document: str, chunk_size: int) -> list:
+    """Feed the document to a tokenizer in chunks of the given size."""
+    document_bytes = document.encode("utf-8")
+    tokenizer = JSONObjectTokenizer()
+    pairs = []
+    for i in range(0, len(document_bytes), chunk_size):
+        pairs += tokenizer.feed(document_bytes[i : i + chunk_size])
+    tokenizer.close()
+    return pairs
+
+
+DOCUMENT = """{
+    "name": "John \\"Doe\\" é😀",
+    "age": 30, "height": -1.5e-7,
+    "contact": {"email": "john@example.com", "tags": ["}", "]", "\\\\"]},
+    "alive": true, "spouse": null, "children": []
+}"""
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 1000])
+def test_tokenizer_chunk_sizes(chunk_size):
+    pairs = tokenize(DOCUMENT, chunk_size)
+    assert pairs == list(json.loads(DOCUMENT).items())
+
+
+def test_tokenizer_empty_object():
+    assert tokenize(" {} ", 1) == []
+
+
+def test_tokenizer_returns_pairs_as_soon_as_complete():
+    tokenizer = JSONObjectTokenizer()
+    assert tokenizer.feed(b'{"a": [1, 2') == []
+    assert tokenizer.feed(b'], "b": 12') == [("a", [1, 2])]
+    # The number could continue in the next chunk
+    assert tokenizer.feed(b"3") == []
+    assert tokenizer.feed(b"}") == [("b", 123)]
+    tokenizer.close()
+
+
+@pytest.mark.parametrize(
+    "document",
+    ["", "[1]", '{"a": 1', '{"a": 1,}', '{"a" 1}', '{"a": }', '{"a": 1} x', "{a: 1}"],
+)
+@pytest.mark.parametrize("chunk_size", [1, 1000])
+def test_tokenizer_invalid_documents(document, chunk_size):
+    with pytest.raises(json.JSONDecodeError):
+        tokenize(document, chunk_size)
+
+
+def test_tokenizer_error_position():
+    document = '{"name": "é", "age": tru}'
+    with pytest.raises(json.JSONDecodeError) as streamed_error:
+        tokenize(document, 2)
+    with pytest.raises(json.JSONDecodeError) as expected_error:
+        json.loads(document)
+    assert streamed_error.value.msg == expected_error.value.msg
+    assert streamed_error.value.pos == expected_error.value.pos
+
+
+def test_transformer_output():
+    transformer = JSONObjectTransformer(str.upper)
+    output = transformer.feed(b'{"a": "x", "b"') + transformer.feed(b': "y"}')
+    output += transformer.close()
+    assert output == b'{"a":"X","b":"Y"}'
+
+
+def test_transformer_empty_object():
+    transformer = JSONObjectTransformer(str.upper)
+    assert transformer.feed(b"{}") + transformer.close() == b"{}"
@@ -112,3 +112,35 @@ def test_sign_list_values_different_order():
     assert response2.status_code == 200
     # Order in lists do matter semantically so different signature
     assert response1.json() != response2.json()
+
+
+def test_sign_default_algorithm_explicit():
+    payload = {"message": "Hello World", "timestamp": 1616161616}
+    response = client.post("/sign", params={"algorithm": "hmac-sha256"}, json=payload)
+    assert response.status_code == 200
+    assert response.json() == {"signature": generate_hmac_signature(payload)}
+
+
+def test_sign_hmac_sha512():
+    payload = {"message": "Hello World", "timestamp": 1616161616}
+    response = client.post("/sign", params={"algorithm": "hmac-sha512"}, json=payload)
+    assert response.status_code == 200
+    payload_bytes = json.dumps(payload).encode("utf-8")
+    digest = hmac.new(SIGNING_KEY, payload_bytes, hashlib.sha512).hexdigest()
+    assert response.json() == {"signature": "hmac-sha512:" + digest}
+
+
+def test_sign_blake2b_header():
+    payload = {"message": "Hello World", "timestamp": 1616161616}
+    response = client.post(
+        "/sign", headers={"X-Signing-Algorithm": "blake2b"}, json=payload
+    )
+    assert response.status_code == 200
+    payload_bytes = json.dumps(payload).encode("utf-8")
+    digest = hashlib.blake2b(payload_bytes, key=SIGNING_KEY, digest_size=32)
+    assert response.json() == {"signature": "blake2b:" + digest.hexdigest()}
+
+
+def test_sign_unknown_algorithm():
+    response = client.post("/sign", params={"algorithm": "md5"}, json={"a": 1})
+    assert response.status_code == 422
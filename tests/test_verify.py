@@ -119,3 +119,37 @@ def test_verify_sign_then_verify_different_order():
     request_body = format_payload(signature, payload_verify)
     verify_response = client.post("/verify", json=request_body)
     assert verify_response.status_code == 204
+
+
+def test_verify_sign_then_verify_other_algorithms():
+    payload = {"message": "Hello World", "timestamp": 1616161616}
+    for algorithm in ("hmac-sha256", "hmac-sha512", "blake2b"):
+        sign_response = client.post(
+            "/sign", params={"algorithm": algorithm}, json=payload
+        )
+        assert sign_response.status_code == 200
+        signature = sign_response.json().get("signature")
+        request_body = format_payload(signature, payload)
+        verify_response = client.post("/verify", json=request_body)
+        assert verify_response.status_code == 204
+
+
+def test_verify_prefixed_default_algorithm():
+    payload = {"message": "Hello World", "timestamp": 1616161616}
+    signature = "hmac-sha256:" + generate_hmac_signature(payload)
+    response = client.post("/verify", json=format_payload(signature, payload))
+    assert response.status_code == 204
+
+
+def test_verify_invalid_algorithm_mismatch():
+    payload = {"message": "Hello World", "timestamp": 1616161616}
+    signature = "blake2b:" + generate_hmac_signature(payload)
+    response = client.post("/verify", json=format_payload(signature, payload))
+    assert response.status_code == 400
+
+
+def test_verify_invalid_unknown_algorithm():
+    payload = {"message": "Hello World", "timestamp": 1616161616}
+    signature = "md5:" + generate_hmac_signature(payload)
+    response = client.post("/verify", json=format_payload(signature, payload))
+    assert response.status_code == 400